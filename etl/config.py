@@ -1,12 +1,9 @@
 
 import os
-from pathlib import Path
-from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-project_root = Path(__file__).parent.parent.resolve()
-load_dotenv(project_root / ".env")
+import etl.env  # loads .env once per process
 
 USER     = os.getenv("user")
 PASSWORD = os.getenv("password")
@@ -19,5 +16,23 @@ if not all([USER, PASSWORD, HOST, PORT, DBNAME]):
 
 db_url = f"postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}?sslmode=require"
 
-engine  = create_engine(db_url, echo=False)
-Session = sessionmaker(bind=engine)
\ No newline at end of file
+# psycopg2 fast-execution helpers: executemany INSERTs become multi-row VALUES
+engine  = create_engine(
+    db_url,
+    echo=False,
+    executemany_mode="values_plus_batch",
+    insertmanyvalues_page_size=1000,
+    executemany_batch_page_size=500,
+    pool_size=8,
+    max_overflow=8,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    # TCP keepalives so idle connections survive slow provider fetches
+    connect_args={
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 3,
+    },
+)
+Session = sessionmaker(bind=engine, expire_on_commit=False)
\ No newline at end of file
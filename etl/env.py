@@ -0,0 +1,10 @@
+"""
+Load the project's .env once per process. Modules that need env vars
+import this instead of calling load_dotenv themselves.
+"""
+
+from pathlib import Path
+from dotenv import load_dotenv
+
+project_root = Path(__file__).parent.parent.resolve()
+load_dotenv(project_root / ".env")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Fetch today's valuation snapshot for every company in the `companies`
+table and persist it to `company_snapshots`.
+"""
+
+from pathlib import Path
+from datetime import date
+import sys
+
+# allow imports from project root
+project_root = Path(__file__).parent.parent.resolve()
+sys.path.append(str(project_root))
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from etl.config           import Session
+from etl.sources.snapshot import fetch_snapshots
+from backend.models       import Company, CompanySnapshot
+
+# Postgres gains little from multi-row INSERTs beyond ~1000 rows
+BATCH_SIZE = 1000
+
+def write_snapshots(rows: list[dict]) -> None:
+    """Insert snapshot rows in BATCH_SIZE chunks, skipping (company, date) duplicates."""
+    session = Session()
+    try:
+        for start in range(0, len(rows), BATCH_SIZE):
+            chunk = rows[start:start + BATCH_SIZE]
+            stmt = (
+                pg_insert(CompanySnapshot)
+                .values(chunk)
+                .on_conflict_do_nothing(index_elements=["company_id", "snapshot_date"])
+            )
+            session.execute(stmt)
+            # commit per chunk to keep each transaction (and its WAL) small
+            session.commit()
+    finally:
+        session.close()
+
+def main():
+    session = Session()
+    companies = session.query(Company.id, Company.ticker).all()
+    session.close()
+
+    ids = {ticker: company_id for company_id, ticker in companies}
+    snapshots = fetch_snapshots(ids)
+    today = date.today()
+
+    rows = [
+        {"company_id": ids[ticker], "snapshot_date": today, **snap}
+        for ticker, snap in snapshots.items()
+    ]
+    write_snapshots(rows)
+
+    print(f"✅ Wrote snapshots for {len(rows)} companies.")
+
+if __name__ == "__main__":
+    main()
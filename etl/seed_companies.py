@@ -5,52 +5,133 @@ by scraping Wikipedia, so no API key is needed.
 """
 
 from pathlib import Path
+import json
 import sys
+import lxml.etree
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
+import urllib3
+from typing import BinaryIO
 
 # allow imports from project root
 project_root = Path(__file__).parent.parent.resolve()
 sys.path.append(str(project_root))
 
-# load .env for DB creds
-load_dotenv(project_root / ".env")
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from etl.config     import Session
 from backend.models import Company
 
 WIKI_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
 
-def fetch_sp500_companies() -> list[tuple[str, str]]:
-    """Scrape Wikipedia’s table and return a list of (ticker, company_name)."""
-    resp = requests.get(WIKI_URL)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+# compiled once; reused on every parse
+_ROWS_XPATH  = lxml.etree.XPath('//table[@id="constituents"]/tbody/tr')
+_CELLS_XPATH = lxml.etree.XPath("./td")
+# Wikipedia writes class shares as BRK.B, Yahoo and friends use BRK-B
+_TICKER_TRANS = str.maketrans(".", "-")
+
+# parsed table + HTTP validators from the last successful fetch
+CACHE_PATH = project_root / ".cache" / "sp500_companies.json"
+
+def _load_cache() -> dict | None:
+    try:
+        return json.loads(CACHE_PATH.read_text())
+    except (OSError, ValueError):
+        return None
 
-    table = soup.find("table", {"id": "constituents"})
-    if not table:
+def _save_cache(resp: requests.Response, companies: list[tuple[str, str]]) -> None:
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    CACHE_PATH.write_text(json.dumps({
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "companies": companies,
+    }))
+
+def _parse_companies(source: BinaryIO, encoding: str) -> list[tuple[str, str]]:
+    parser = lxml.html.HTMLParser(encoding=encoding)
+    doc = lxml.html.parse(source, parser=parser).getroot()
+    if doc is None:
+        raise RuntimeError("Wikipedia returned an empty or truncated page")
+
+    rows = _ROWS_XPATH(doc)
+    if not rows:
         raise RuntimeError("Could not find the S&P 500 table on Wikipedia")
 
     results: list[tuple[str, str]] = []
-    for row in table.tbody.find_all("tr"):
-        cols = row.find_all("td")
-        if cols:
-            ticker = cols[0].get_text(strip=True).replace(".", "-")
-            name = cols[1].get_text(strip=True)
+    for row in rows:
+        cols = _CELLS_XPATH(row)
+        if len(cols) >= 2:
+            ticker = cols[0].text_content().strip().translate(_TICKER_TRANS)
+            name = cols[1].text_content().strip()
             results.append((ticker, name))
     return results
 
+def fetch_sp500_companies() -> list[tuple[str, str]]:
+    """Scrape Wikipedia’s table and return a list of (ticker, company_name).
+
+    Uses a conditional GET against the on-disk cache, so an unchanged page
+    is neither re-downloaded nor re-parsed.
+    """
+    cache = _load_cache()
+    headers = {}
+    if cache:
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+
+    try:
+        with requests.get(WIKI_URL, headers=headers, stream=True) as resp:
+            if resp.status_code == 304 and cache:
+                return [tuple(c) for c in cache["companies"]]
+            resp.raise_for_status()
+            # parse straight off the socket instead of buffering resp.text;
+            # the raw stream carries no charset, so pass the header's along
+            resp.raw.decode_content = True
+            results = _parse_companies(resp.raw, resp.encoding or "utf-8")
+    except (
+        requests.RequestException,
+        urllib3.exceptions.HTTPError,
+        lxml.etree.LxmlError,
+        RuntimeError,
+    ):
+        if cache:
+            print("⚠️ Wikipedia fetch or parse failed, using cached S&P 500 list.")
+            return [tuple(c) for c in cache["companies"]]
+        raise
+
+    _save_cache(resp, results)
+    return results
+
 def main():
     companies = fetch_sp500_companies()
     session = Session()
     added = 0
 
+    existing = {t for (t,) in session.query(Company.ticker).all()}
+    existing_before = bool(existing)
+    new_rows = []
     for ticker, name in companies:
-        exists = session.query(Company).filter_by(ticker=ticker).first()
-        if not exists:
-            session.add(Company(ticker=ticker, name=name))
-            added += 1
+        if ticker not in existing:
+            new_rows.append({"ticker": ticker, "name": name})
+            existing.add(ticker)
+
+    if new_rows and not existing_before:
+        # first seed: build the ticker index once after loading instead of
+        # maintaining it row by row; DDL is transactional, so a failure
+        # rolls back to the original index
+        conn = session.connection()
+        for idx in Company.__table__.indexes:
+            idx.drop(bind=conn, checkfirst=True)
+        session.execute(pg_insert(Company), new_rows)
+        for idx in Company.__table__.indexes:
+            idx.create(bind=conn)
+        added = len(new_rows)
+    elif new_rows:
+        # one multi-row INSERT; ON CONFLICT covers a concurrent seed run
+        stmt = pg_insert(Company).on_conflict_do_nothing(index_elements=["ticker"])
+        session.execute(stmt, new_rows)
+        added = len(new_rows)
 
     session.commit()
     session.close()
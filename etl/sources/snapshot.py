@@ -1,14 +1,16 @@
 from __future__ import annotations
 
-import os, sys, requests, yfinance as yf
+import os, sys, time, threading, httpx, orjson, yfinance as yf
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from dotenv import load_dotenv
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
 
 project_root = Path(__file__).parent.parent.parent.resolve()
 sys.path.append(str(project_root))
-load_dotenv(project_root / ".env")
+
+import etl.env  # loads .env once per process
 
 FINNHUB_KEY = os.getenv("FINNHUB_API_KEY")
 FINNHUB_URL = "https://finnhub.io/api/v1"
@@ -16,19 +18,86 @@ FINNHUB_URL = "https://finnhub.io/api/v1"
 FMP_KEY = os.getenv("FMP_API_KEY")
 FMP_URL = "https://financialmodelingprep.com/api/v3"
 
+# one HTTP/2 client shared by all threads: Finnhub/FMP calls multiplex over
+# a kept-alive connection per host instead of reconnecting per request
+_CLIENT = httpx.Client(
+    http2=True,
+    timeout=10,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+)
+MAX_RETRIES = 4
+# longest 429 back-off honoured; FMP signals its daily quota with 429 and a
+# large Retry-After, which would otherwise park a worker thread for hours
+MAX_RETRY_WAIT = 60
+
+MAX_WORKERS = 8
+
+# shared pool for the four independent provider calls inside fetch_snapshot;
+# sized so every fetch_snapshots worker can have all four in flight
+_PROVIDER_POOL = ThreadPoolExecutor(max_workers=4 * MAX_WORKERS, thread_name_prefix="snapshot")
+
+
+class _RateLimiter:
+    """Thread-safe sliding-window limiter: at most `rate` calls per `period` seconds."""
+
+    def __init__(self, rate: int, period: float):
+        self.rate = rate
+        self.period = period
+        self._calls: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.rate:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
+
+# caps FMP bursts per minute; it does not track the daily quota
+_FMP_LIMITER = _RateLimiter(240, 60)
+# Finnhub free tier allows about 60 calls/min
+_FINNHUB_LIMITER = _RateLimiter(60, 60)
+
+
+def _get(url: str, limiter: _RateLimiter | None = None, **kwargs: Any) -> httpx.Response:
+    """GET via the shared client, backing off exponentially (or per Retry-After) on 429.
+
+    `limiter`, if given, is acquired before every attempt, retries included.
+    Gives up and returns the 429 when the server asks for more than
+    MAX_RETRY_WAIT seconds.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter:
+            limiter.acquire()
+        r = _CLIENT.get(url, **kwargs)
+        if r.status_code != 429 or attempt == MAX_RETRIES:
+            return r
+        retry_after = r.headers.get("Retry-After", "")
+        wait = int(retry_after) if retry_after.isdigit() else 2 ** attempt
+        if wait > MAX_RETRY_WAIT:
+            return r
+        time.sleep(wait)
+    return r
 
 
 def _finnhub_metric(ticker: str) -> Dict[str, Any]:
     if not FINNHUB_KEY:
         return {}
     try:
-        r = requests.get(
+        r = _get(
             f"{FINNHUB_URL}/stock/metric",
-            params={"symbol": ticker, "metric": "all", "token": FINNHUB_KEY},
-            timeout=10,
+            limiter=_FINNHUB_LIMITER,
+            params={"symbol": ticker, "metric": "all"},
+            headers={"X-Finnhub-Token": FINNHUB_KEY},
         )
         r.raise_for_status()
-        return r.json().get("metric", {})
+        return orjson.loads(r.content).get("metric", {})
     except Exception as e:
         print(f"Finnhub API error: {e}")
         return {}
@@ -41,9 +110,9 @@ def _fmp_endpoint(path: str, params: Dict[str, Any] | None = None) -> Any:
     q = {"apikey": FMP_KEY, **(params or {})}
     try:
         url = f"{FMP_URL}/{path}"
-        r = requests.get(url, params=q, timeout=10)
+        r = _get(url, limiter=_FMP_LIMITER, params=q)
         r.raise_for_status()
-        data = r.json()
+        data = orjson.loads(r.content)
         return data
     except Exception as e:
         print(f"FMP API error: {e}")
@@ -67,23 +136,29 @@ def _yfinance_balance_dividend(ticker: str) -> Dict[str, Any]:
         "net_cash": None,
         "ex_div_date": None,
         "payout_date": None,
+        "pays_dividend": None,  # unknown until yfinance answers
     }
     try:
         yf_tkr = yf.Ticker(ticker)
         bs = yf_tkr.balance_sheet
         if not bs.empty:
+            # most recent period is the first column: {line_item: value}
+            latest = bs.iloc[:, 0].to_dict()
             for lbl in ("Cash And Cash Equivalents", "Total Cash", "Cash"):
-                if lbl in bs.index:
-                    res["cash"] = int(bs.loc[lbl].iloc[0])
+                val = latest.get(lbl)
+                if val is not None and val == val:  # skip missing and NaN
+                    res["cash"] = int(val)
                     break
             for lbl in ("Long Term Debt", "Total Debt"):
-                if lbl in bs.index:
-                    res["debt"] = int(bs.loc[lbl].iloc[0])
+                val = latest.get(lbl)
+                if val is not None and val == val:
+                    res["debt"] = int(val)
                     break
             if res["cash"] is not None and res["debt"] is not None:
                 res["net_cash"] = res["cash"] - res["debt"]
         # dividends
         divs = yf_tkr.dividends
+        res["pays_dividend"] = not divs.empty
         if not divs.empty:
             ex = divs.index[-1]
             res["ex_div_date"] = ex.date() if hasattr(ex, "date") else None
@@ -93,105 +168,164 @@ def _yfinance_balance_dividend(ticker: str) -> Dict[str, Any]:
     return res
 
 
-def fetch_snapshot(ticker: str) -> Dict[str, Any]:
-    finnhub = _finnhub_metric(ticker)
-    yfin    = _yfinance_balance_dividend(ticker)
-    fmp_km  = _fmp_key_metrics(ticker)
-    fmp_bs  = _fmp_balance_sheet(ticker)
-
-    market_cap     = finnhub.get("marketCapitalization") or fmp_km.get("marketCapTTM")
-    pe_ttm         = finnhub.get("peTTM") or fmp_km.get("peRatioTTM")
-    
-    earnings_yoy = finnhub.get("epsGrowthQuarterlyYoy") or fmp_km.get("epsGrowthQuarterlyYoy")
-    revenue_yoy  = finnhub.get("revenueGrowthQuarterlyYoy") or fmp_km.get("revenueGrowthQuarterlyYOY")
-    
-    pe_fwd = (
-        finnhub.get("forwardPE") or 
-        fmp_km.get("forwardPE")
+# Fallback order per output field: first (source, key) with a non-None value wins.
+FIELD_SOURCES: Dict[str, tuple[tuple[str, str], ...]] = {
+    "market_cap":     (("finnhub", "marketCapitalization"), ("fmp_km", "marketCapTTM")),
+    "pe_ttm":         (("finnhub", "peTTM"), ("fmp_km", "peRatioTTM")),
+    "pe_fwd":         (("finnhub", "forwardPE"), ("fmp_km", "forwardPE")),
+    "price_to_sales": (("finnhub", "psTTM"), ("fmp_km", "priceToSalesRatioTTM")),
+    "price_to_book":  (
+        ("finnhub", "pbTTM"),
+        ("fmp_km", "priceToBookRatioTTM"),
+        ("fmp_km", "pbRatioTTM"),
+        ("fmp_km", "ptbRatioTTM"),
+    ),
+    "fcf_yield":      (("finnhub", "currentEv/freeCashFlowTTM"), ("fmp_km", "freeCashFlowYieldTTM")),
+    "profit_margin":        (("finnhub", "netProfitMarginTTM"), ("fmp_km", "netProfitMarginTTM")),
+    "operating_margin_ttm": (("finnhub", "operatingMarginTTM"), ("fmp_km", "operatingMarginTTM")),
+    "earnings_yoy":   (("finnhub", "epsGrowthQuarterlyYoy"), ("fmp_km", "epsGrowthQuarterlyYoy")),
+    "revenue_yoy":    (("finnhub", "revenueGrowthQuarterlyYoy"), ("fmp_km", "revenueGrowthQuarterlyYOY")),
+    "cash":           (("yfin", "cash"), ("fmp_bs", "cashAndCashEquivalents")),
+    "debt":           (("yfin", "debt"), ("fmp_bs", "totalDebt")),
+    "dividend_yield": (("finnhub", "dividendYieldIndicatedAnnual"), ("fmp_km", "dividendYieldTTM")),
+    "payout_ratio":   (("finnhub", "payoutRatioTTM"), ("fmp_km", "payoutRatioTTM")),
+}
+
+# inputs for the ev_to_ebitda fallback, not returned themselves
+EV_SOURCES     = (("finnhub", "enterpriseValue"), ("fmp_km", "enterpriseValueTTM"))
+EBITDA_SOURCES = (("finnhub", "ebitdaTTM"), ("fmp_km", "ebitdaTTM"))
+
+# dividend fields are None for non-payers, so a missing Finnhub value there
+# only needs FMP when yfinance shows (or can't rule out) a dividend history
+_DIVIDEND_FIELDS = {"dividend_yield", "payout_ratio"}
+
+
+def _finnhub_keys(fields) -> tuple[str, ...]:
+    return tuple(
+        key
+        for srcs in (*(FIELD_SOURCES[f] for f in fields), EV_SOURCES, EBITDA_SOURCES)
+        for src, key in srcs
+        if src == "finnhub"
     )
-    
+
+
+# Finnhub keys that must all be present for FMP key-metrics to be skipped
+_FINNHUB_KEYS        = _finnhub_keys(FIELD_SOURCES)
+_FINNHUB_KEYS_NO_DIV = _finnhub_keys(f for f in FIELD_SOURCES if f not in _DIVIDEND_FIELDS)
+
+
+def _resolve(sources: Dict[str, Dict[str, Any]], srcs: tuple[tuple[str, str], ...]) -> Any:
+    for src, key in srcs:
+        val = sources[src].get(key)
+        if val is not None:
+            return val
+    return None
+
+
+def _estimate_pe_fwd(pe_ttm: Any, earnings_yoy: Any) -> Any:
+    """Estimate forward P/E from current P/E and earnings growth."""
+    # Handle both positive and negative growth
+    if earnings_yoy > 0:
+        # For positive growth: adjust P/E downward based on expected earnings increase
+        estimated_growth = 1 + (earnings_yoy / 100)
+        return pe_ttm / estimated_growth
+    if earnings_yoy < 0:
+        # For negative growth: adjust P/E upward based on expected earnings decrease
+        # The more negative the growth, the higher the forward P/E
+        estimated_decline = 1 + (earnings_yoy / 100)  # Will be < 1 for negative growth
+        if estimated_decline > 0:  # Protect against division by zero or negative
+            return pe_ttm / estimated_decline
+        # If estimated decline would cause earnings to go negative or zero,
+        # we can't reasonably estimate a forward P/E
+    return None
+
+
+def fetch_snapshot(ticker: str) -> Dict[str, Any]:
+    finnhub_f = _PROVIDER_POOL.submit(_finnhub_metric, ticker)
+    yfin_f    = _PROVIDER_POOL.submit(_yfinance_balance_dividend, ticker)
+
+    # FMP is rate limited, so only call it when Finnhub/yfinance leave a field
+    # unresolved; yfinance tells us whether missing dividend data is real
+    finnhub  = finnhub_f.result()
+    yfin     = yfin_f.result()
+    required = _FINNHUB_KEYS_NO_DIV if yfin["pays_dividend"] is False else _FINNHUB_KEYS
+    fmp_km_f = None
+    if any(finnhub.get(key) is None for key in required):
+        fmp_km_f = _PROVIDER_POOL.submit(_fmp_key_metrics, ticker)
+
+    fmp_bs_f = None
+    if yfin["cash"] is None or yfin["debt"] is None:
+        fmp_bs_f = _PROVIDER_POOL.submit(_fmp_balance_sheet, ticker)
+
+    fmp_km = fmp_km_f.result() if fmp_km_f else {}
+    fmp_bs = fmp_bs_f.result() if fmp_bs_f else {}
+
+    sources = {"finnhub": finnhub, "fmp_km": fmp_km, "fmp_bs": fmp_bs, "yfin": yfin}
+    fields = {f: _resolve(sources, srcs) for f, srcs in FIELD_SOURCES.items()}
+
     # If forward P/E is not available, we can estimate it based on current P/E and growth rates
-    if pe_fwd is None and pe_ttm is not None and earnings_yoy is not None:
-        # Handle both positive and negative growth
-        if earnings_yoy > 0:
-            # For positive growth: adjust P/E downward based on expected earnings increase
-            estimated_growth = 1 + (earnings_yoy / 100)
-            pe_fwd = pe_ttm / estimated_growth
-        elif earnings_yoy < 0:
-            # For negative growth: adjust P/E upward based on expected earnings decrease
-            # The more negative the growth, the higher the forward P/E
-            estimated_decline = 1 + (earnings_yoy / 100)  # Will be < 1 for negative growth
-            if estimated_decline > 0:  # Protect against division by zero or negative
-                pe_fwd = pe_ttm / estimated_decline
-            else:
-                # If estimated decline would cause earnings to go negative or zero,
-                # we can't reasonably estimate a forward P/E
-                pe_fwd = None
-    
-    price_to_sales = finnhub.get("psTTM") or fmp_km.get("priceToSalesRatioTTM")
-    
-    ev_to_ebitda = (
-        fmp_km.get("enterpriseValueOverEBITDATTM") or
-        (
-            (finnhub.get("enterpriseValue") or fmp_km.get("enterpriseValueTTM")) and
-            (finnhub.get("ebitdaTTM") or fmp_km.get("ebitdaTTM")) and
-            (finnhub.get("enterpriseValue") or fmp_km.get("enterpriseValueTTM")) /
-            (finnhub.get("ebitdaTTM") or fmp_km.get("ebitdaTTM"))
-        )
-    )
-    
-    price_to_book = (
-        finnhub.get("pbTTM") or 
-        fmp_km.get("priceToBookRatioTTM") or 
-        fmp_km.get("pbRatioTTM") or 
-        fmp_km.get("ptbRatioTTM")
-    )
-    
-    fcf_yield = finnhub.get("currentEv/freeCashFlowTTM") or fmp_km.get("freeCashFlowYieldTTM")
+    if fields["pe_fwd"] is None and fields["pe_ttm"] is not None and fields["earnings_yoy"] is not None:
+        fields["pe_fwd"] = _estimate_pe_fwd(fields["pe_ttm"], fields["earnings_yoy"])
 
-    profit_margin        = finnhub.get("netProfitMarginTTM") or fmp_km.get("netProfitMarginTTM")
-    operating_margin_ttm = finnhub.get("operatingMarginTTM") or fmp_km.get("operatingMarginTTM")
+    # Finnhub first, like every other field, so the value doesn't depend on
+    # whether FMP key-metrics was called; FMP's ratio/inputs are the fallback
+    fh_ev, fh_ebitda = finnhub.get("enterpriseValue"), finnhub.get("ebitdaTTM")
+    if fh_ev and fh_ebitda:
+        ev_to_ebitda = fh_ev / fh_ebitda
+    else:
+        ev_to_ebitda = fmp_km.get("enterpriseValueOverEBITDATTM")
+        if ev_to_ebitda is None:
+            ev     = _resolve(sources, EV_SOURCES)
+            ebitda = _resolve(sources, EBITDA_SOURCES)
+            if ev and ebitda:
+                ev_to_ebitda = ev / ebitda
 
     # Balance
-    cash     = yfin["cash"]  or fmp_bs.get("cashAndCashEquivalents")
-    debt     = yfin["debt"]  or fmp_bs.get("totalDebt")
+    cash, debt = fields["cash"], fields["debt"]
     net_cash = yfin["net_cash"]
     if net_cash is None and (cash is not None and debt is not None):
         net_cash = cash - debt
 
-    # Dividend
-    dividend_yield = finnhub.get("dividendYieldIndicatedAnnual") or fmp_km.get("dividendYieldTTM")
-    payout_ratio   = finnhub.get("payoutRatioTTM") or fmp_km.get("payoutRatioTTM")
-    ex_div_date    = yfin["ex_div_date"]
-    payout_date    = yfin["payout_date"]
-
     return {
-        "market_cap": market_cap,
-        "pe_ttm":     pe_ttm,
-        "pe_fwd":     pe_fwd,
-        "price_to_sales":  price_to_sales,
+        "market_cap": fields["market_cap"],
+        "pe_ttm":     fields["pe_ttm"],
+        "pe_fwd":     fields["pe_fwd"],
+        "price_to_sales":  fields["price_to_sales"],
         "ev_to_ebitda":    ev_to_ebitda,
-        "price_to_book":   price_to_book,
-        "fcf_yield":       fcf_yield,
-        "profit_margin":        profit_margin,
-        "operating_margin_ttm": operating_margin_ttm,
-        "earnings_yoy":         earnings_yoy,
-        "revenue_yoy":          revenue_yoy,
+        "price_to_book":   fields["price_to_book"],
+        "fcf_yield":       fields["fcf_yield"],
+        "profit_margin":        fields["profit_margin"],
+        "operating_margin_ttm": fields["operating_margin_ttm"],
+        "earnings_yoy":         fields["earnings_yoy"],
+        "revenue_yoy":          fields["revenue_yoy"],
         "cash":      cash,
         "debt":      debt,
         "net_cash":  net_cash,
-        "dividend_yield": dividend_yield,
-        "payout_ratio":   payout_ratio,
-        "ex_div_date":    ex_div_date,
-        "payout_date":    payout_date,
+        "dividend_yield": fields["dividend_yield"],
+        "payout_ratio":   fields["payout_ratio"],
+        "ex_div_date":    yfin["ex_div_date"],
+        "payout_date":    yfin["payout_date"],
     }
 
 
+def fetch_snapshots(
+    tickers: Iterable[str], max_workers: int = MAX_WORKERS
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch snapshots for many tickers concurrently, keyed by ticker."""
+    tickers = list(tickers)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(tickers, pool.map(fetch_snapshot, tickers)))
+
+
 if __name__ == "__main__":
     import pprint, argparse
 
     parser = argparse.ArgumentParser(description="Fech snapshot for ticker")
-    parser.add_argument("ticker", nargs="?", default="TSLA")
+    parser.add_argument("tickers", nargs="*", default=["TSLA"])
     args = parser.parse_args()
 
-    pprint.pprint(fetch_snapshot(args.ticker.upper()))
\ No newline at end of file
+    tickers = [t.upper() for t in args.tickers]
+    if len(tickers) == 1:
+        pprint.pprint(fetch_snapshot(tickers[0]))
+    else:
+        pprint.pprint(fetch_snapshots(tickers))
\ No newline at end of file